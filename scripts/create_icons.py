@@ -3,91 +3,172 @@
 Script to create all icons for GPU Temperature Monitor
 - Regular icons: thermometer with transparent background
 - Dev icons: same thermometer with black background
-Requires: pip install Pillow
+Requires: pip install Pillow numpy
 """
 
-from PIL import Image, ImageDraw
+import functools
+import hashlib
+import io
+import json
+from PIL import Image
+import numpy as np
 import os
+import sys
+from pathlib import Path
 
-def create_thermometer_icon(size, color, background_color, output_path):
-    """Create a thermometer icon with specified colors and size"""
-    img = Image.new('RGBA', (size, size), background_color)
-    draw = ImageDraw.Draw(img)
+# Per-icon hashes of the inputs of the last build, stored in the icons directory
+CACHE_FILE = '.cache.json'
+
+# Region labels used by _thermometer_masks
+_OUTLINE, _FILL, _MERCURY = 1, 2, 3
+
+@functools.lru_cache(maxsize=8)
+def _thermometer_masks(size):
+    """Rasterize the thermometer shape once per size.
+
+    Returns read-only (outline, fill, mercury) boolean masks. Later shapes
+    overwrite earlier ones, so every pixel belongs to at most one mask.
+    """
+    regions = np.zeros((size, size), dtype=np.uint8)
+    yy, xx = np.ogrid[:size, :size]
 
     # Scale factors based on icon size
     scale = size / 32
 
-    # Use WHITE outline for BOTH versions for consistency
-    # This ensures the icons look identical regardless of background
-    outline_color = 'white'
-
     # Thermometer tube (vertical rectangle)
     tube_x = int(size // 2)
     tube_top = int(3 * scale)
     tube_bottom = int(20 * scale)
     tube_width = int(3 * scale)
+    tube_left = tube_x - tube_width
+    tube_right = tube_x + tube_width
 
-    # Draw thermometer tube with white outline (consistent for both versions)
-    draw.rectangle([
-        tube_x - tube_width, tube_top,
-        tube_x + tube_width, tube_bottom
-    ], outline=outline_color, width=2, fill=color)
+    # Thermometer tube with a 2px outline
+    regions[tube_top:tube_bottom + 1, tube_left:tube_right + 1] = _OUTLINE
+    regions[tube_top + 2:tube_bottom - 1, tube_left + 2:tube_right - 1] = _FILL
 
     # Thermometer bulb (larger circle at bottom)
     bulb_radius = int(5 * scale)
     bulb_center_x = tube_x
     bulb_center_y = int(25 * scale)
 
-    # Draw bulb with white outline (consistent for both versions)
-    draw.ellipse([
-        bulb_center_x - bulb_radius, bulb_center_y - bulb_radius,
-        bulb_center_x + bulb_radius, bulb_center_y + bulb_radius
-    ], outline=outline_color, width=2, fill=color)
+    # Bulb as outer disc minus inner disc, giving a 2px outline
+    # (+0.5 covers the whole edge pixel, matching an inclusive bounding box)
+    bulb_dist = (xx - bulb_center_x) ** 2 + (yy - bulb_center_y) ** 2
+    regions[bulb_dist <= (bulb_radius + 0.5) ** 2] = _OUTLINE
+    regions[bulb_dist <= (bulb_radius - 1.5) ** 2] = _FILL
 
-    # Temperature markings (scale marks on the right side) - white for both versions
+    # Temperature markings (scale marks on the right side)
     mark_length = int(2 * scale)
     for i in range(4):
         mark_y = tube_top + int((i + 1) * 3 * scale)
-        draw.line([
-            tube_x + tube_width + 1, mark_y,
-            tube_x + tube_width + 1 + mark_length, mark_y
-        ], fill=outline_color, width=1)
+        regions[mark_y, tube_right + 1:tube_right + 2 + mark_length] = _OUTLINE
 
-    # Add temperature level indicator inside tube
+    # Temperature level indicator inside tube
     level_height = int(12 * scale)  # How much of the tube is "filled"
     level_bottom = tube_bottom - 1
     level_top = level_bottom - level_height
+    regions[level_top:level_bottom, tube_left + 2:tube_right - 1] = _MERCURY
 
-    # Draw the "mercury" level with slightly different shade
-    mercury_color = tuple(min(255, c + 20) if i < 3 else c for i, c in enumerate(color))
-    draw.rectangle([
-        tube_x - tube_width + 2, level_top,
-        tube_x + tube_width - 2, level_bottom - 1
-    ], fill=mercury_color)
+    masks = tuple(regions == region for region in (_OUTLINE, _FILL, _MERCURY))
+    for mask in masks:
+        mask.flags.writeable = False
+    return masks
 
-    return img
+def _render_thermometer(size, color, background_color):
+    """Render the thermometer as a (size, size, 4) uint8 RGBA array"""
+    outline_mask, fill_mask, mercury_mask = _thermometer_masks(size)
 
-def create_ico_file(png_path, ico_path):
-    """Convert PNG to ICO format with multiple sizes"""
-    try:
-        img = Image.open(png_path)
-        # Create ICO with multiple sizes (16x16, 32x32, 48x48)
-        sizes = [(16, 16), (32, 32), (48, 48)]
+    arr = np.empty((size, size, 4), dtype=np.uint8)
+    arr[:] = background_color
 
-        images = []
-        for size in sizes:
-            resized = img.resize(size, Image.Resampling.LANCZOS)
-            images.append(resized)
+    # Use WHITE outline for BOTH versions for consistency
+    # This ensures the icons look identical regardless of background
+    outline_color = (255, 255, 255, 255)
+
+    # The "mercury" level uses a slightly different shade
+    mercury_color = np.array(color, dtype=np.int16)
+    mercury_color[:3] = np.minimum(mercury_color[:3] + 20, 255)
+
+    arr[outline_mask] = outline_color
+    arr[fill_mask] = color
+    arr[mercury_mask] = mercury_color
+
+    return arr
+
+def create_icon_frames(color, background_color):
+    """Render the 32x32 and 48x48 ICO frames natively and derive 16x16 from the 48x48 one"""
+    master_img = Image.fromarray(_render_thermometer(48, color, background_color))
+    return {
+        # Native geometry is too coarse at 16x16, so that frame is downsampled instead
+        (16, 16): master_img.resize((16, 16), Image.Resampling.BOX),
+        (32, 32): Image.fromarray(_render_thermometer(32, color, background_color)),
+        (48, 48): master_img,
+    }
+
+def _write_file(path, data):
+    """Write a complete in-memory file with unbuffered os.write calls"""
+    # O_BINARY (Windows only) stops newline translation from corrupting image data
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+    fd = os.open(path, flags, 0o644)
+    try:
+        # os.write may write fewer bytes than asked; keep going until all are out
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def save_image(img, path, format, **params):
+    """Encode an image in memory, then write it to disk in one call"""
+    buffer = io.BytesIO()
+    img.save(buffer, format=format, **params)
+    _write_file(path, buffer.getbuffer())
+
+def create_ico_file(images, ico_path):
+    """Save prebuilt icon frames, ordered smallest to largest, as one ICO"""
+    try:
+        sizes = [img.size for img in images]
 
-        # Save as ICO
-        images[0].save(ico_path, format='ICO', sizes=[(img.width, img.height) for img in images])
+        # Save as ICO from the largest frame; Pillow drops sizes bigger than the
+        # saved image, so the smaller frames are passed via append_images
+        save_image(images[-1], ico_path, 'ICO', sizes=sizes, append_images=images[:-1])
         print(f"Created ICO: {ico_path}")
+        return True
+
+    except OSError as e:
+        print(f"Error creating ICO file {ico_path}: {e}", file=sys.stderr)
+        return False
+
+@functools.lru_cache(maxsize=1)
+def _script_source():
+    """Source of this script, so any change to the drawing code invalidates the cache"""
+    return Path(__file__).read_bytes()
 
-    except Exception as e:
-        print(f"Error creating ICO file {ico_path}: {e}")
+def icon_cache_key(icon_name, color, background_color, size):
+    """Hash every input that determines the generated icon files"""
+    inputs = (icon_name, tuple(color), tuple(background_color), size, _script_source())
+    return hashlib.sha256(repr(inputs).encode()).hexdigest()
 
-def create_icon_set(icons_dir, base_name, color, description):
-    """Create both regular and dev versions of an icon with the same thermometer design"""
+def load_icon_cache(icons_dir):
+    """Load the build cache, treating a missing or corrupt file as empty"""
+    try:
+        return json.loads((icons_dir / CACHE_FILE).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+def save_icon_cache(icons_dir, cache):
+    """Persist the build cache next to the generated icons"""
+    (icons_dir / CACHE_FILE).write_text(json.dumps(cache, indent=2, sort_keys=True), encoding='utf-8')
+
+def create_icon_set(icons_dir, base_name, color, description, cache):
+    """Create both regular and dev versions of an icon with the same thermometer design
+
+    Icons whose cache key matches `cache` and whose files exist are skipped.
+    Returns (cache entries for the icons written, names of icons that failed).
+    """
+    updated = {}
+    failed = []
     print(f"\nCreating {description} icons...")
 
     # Generate both regular and dev versions using the same function
@@ -97,24 +178,36 @@ def create_icon_set(icons_dir, base_name, color, description):
     ]
 
     for icon_name, bg_color, version_type in versions:
+        png_path = icons_dir / f"{icon_name}.png"
+        ico_path = icons_dir / f"{icon_name}.ico"
+
+        # Skip icons whose inputs are unchanged since the last build
+        key = icon_cache_key(icon_name, color, bg_color, 48)
+        if cache.get(icon_name) == key and png_path.exists() and ico_path.exists():
+            print(f"  {version_type}: {icon_name} (unchanged, skipped)")
+            continue
+
         print(f"  {version_type}: {icon_name}")
 
-        # Create icon using the same function, just different background
-        img = create_thermometer_icon(32, color, bg_color, None)
+        # Create icon frames using the same function, just different background
+        frames = create_icon_frames(color, bg_color)
 
-        # Save as PNG
-        png_path = os.path.join(icons_dir, f"{icon_name}.png")
-        img.save(png_path, 'PNG')
+        # Save the 32x32 frame as PNG (kept as a separate artifact)
+        save_image(frames[(32, 32)], png_path, 'PNG')
         print(f"    PNG: {png_path}")
 
-        # Convert to ICO
-        ico_path = os.path.join(icons_dir, f"{icon_name}.ico")
-        create_ico_file(png_path, ico_path)
+        # Save as ICO
+        if create_ico_file(list(frames.values()), ico_path):
+            updated[icon_name] = key
+        else:
+            failed.append(icon_name)
+
+    return updated, failed
 
 def main():
     # Create icons directory if it doesn't exist
-    icons_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'icons')
-    os.makedirs(icons_dir, exist_ok=True)
+    icons_dir = Path(__file__).resolve().parent.parent / 'icons'
+    icons_dir.mkdir(exist_ok=True)
 
     # Icon configurations: (base_name, color, description)
     icon_configs = [
@@ -125,9 +218,20 @@ def main():
 
     print("Creating all thermometer icons...")
 
+    cache = load_icon_cache(icons_dir)
+
     # Create icon sets using parameterized function
+    failed = []
     for base_name, color, description in icon_configs:
-        create_icon_set(icons_dir, base_name, color, description)
+        updated, set_failed = create_icon_set(icons_dir, base_name, color, description, cache)
+        cache.update(updated)
+        failed.extend(set_failed)
+
+    save_icon_cache(icons_dir, cache)
+
+    if failed:
+        print(f"\n❌ Failed to create icons: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
 
     print("\n✅ All icons created successfully!")
     print("\nIcon usage:")